@@ -1,91 +1,181 @@
-                             
+
 from __future__ import annotations
-import math
+import numpy as np
 import pandas as pd
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
-def _safe(x, default=0.0):
-    try:
-        return float(x)
-    except Exception:
-        return float(default)
+
+def _backlog_loop(admitted: np.ndarray, capacity: np.ndarray, backlog0: float = 0.0):
+    """Serial backlog/processed recurrence over windows (JIT-compiled when numba is present)."""
+    n = admitted.shape[0]
+    backlog = np.empty(n)
+    processed = np.empty(n)
+    b = backlog0
+    for i in range(n):
+        p = min(capacity[i], admitted[i] + b)
+        b = max(0.0, b + admitted[i] - p)
+        backlog[i] = b
+        processed[i] = p
+    return backlog, processed
+
+
+if njit is not None:
+    _backlog_loop = njit(cache=True, fastmath=True)(_backlog_loop)
+
+
+def _col(df: pd.DataFrame, name: str, default: float = 0.0) -> np.ndarray:
+    """Column as float64 ndarray; missing/invalid values fall back to default."""
+    if name not in df.columns:
+        return np.full(len(df), float(default))
+    return pd.to_numeric(df[name], errors="coerce").fillna(float(default)).to_numpy(dtype=np.float64)
+
+
+def _build_effect_table(effects: dict) -> dict:
+    """action name -> (admission_mult, overhead_mult, drop_share)."""
+    effect_table = {}
+    for name, eff in effects.items():
+        drop = 0.0
+        if "drop_new_mmsi_mult" in eff:
+            drop = max(drop, 1.0 - float(eff["drop_new_mmsi_mult"]))
+        if "drop_suspicious_mult" in eff:
+            drop = max(drop, 1.0 - float(eff["drop_suspicious_mult"]))
+        effect_table[name] = (
+            float(eff.get("admission_rate_mult", 1.0)),
+            float(eff.get("consensus_overhead_mult", 1.0)),
+            drop,
+        )
+    return effect_table
+
+
+def _simulate_chunk(
+    feats_with_policy: pd.DataFrame,
+    effect_table: dict,
+    base_capacity_tps: float,
+    base_offered_per_window: float,
+    base_latency_ms: float,
+    backlog0: float = 0.0,
+):
+    """Simulate one contiguous slice of windows; returns (frame, final backlog)."""
+    n = len(feats_with_policy)
+
+    f2 = _col(feats_with_policy, "F2_new_mmsi_rate")
+    f3 = _col(feats_with_policy, "F3_message_burstiness")
+    f4 = _col(feats_with_policy, "F4_position_jump_rate")
+
+
+
+    offered = base_offered_per_window * (
+        1.0
+        + 0.8 * np.log1p(np.maximum(0.0, f3))
+        + 1.2 * np.maximum(0.0, f2)
+    )
+
+
+    overhead_mult = 1.0 + 0.6 * np.clip(f4, 0.0, 1.0)
+
+
+    no_effect = (1.0, 1.0, 0.0)
+
+    admission_mult = np.ones(n)
+    drop_share = np.zeros(n)
+    if "policy_actions" in feats_with_policy.columns:
+        actions_col = feats_with_policy["policy_actions"].tolist()
+    else:
+        actions_col = [[]] * n
+    for i, acts in enumerate(actions_col):
+        for a in (acts or []):
+            adm, oh, drop = effect_table.get(a, no_effect)
+            admission_mult[i] *= adm
+            overhead_mult[i] *= oh
+            drop_share[i] = max(drop_share[i], drop)
+
+
+    capacity = base_capacity_tps / np.maximum(1e-6, overhead_mult)
+
+
+    accepted = offered * admission_mult
+    dropped = accepted * drop_share
+    admitted = np.maximum(0.0, accepted - dropped)
+
+    window_ids = _col(feats_with_policy, "window_id").astype(np.int64)
+    if "policy_fired" in feats_with_policy.columns:
+        policy_fired = feats_with_policy["policy_fired"].to_numpy(dtype=bool)
+    else:
+        policy_fired = np.zeros(n, dtype=bool)
+
+
+    backlog, processed = _backlog_loop(admitted, capacity, backlog0)
+
+
+    latency = base_latency_ms * (1.0 + 0.45 * np.log1p(backlog * (1.0 / max(1.0, base_offered_per_window))))
+
+    frame = pd.DataFrame({
+        "window_id": window_ids,
+        "offered": offered,
+        "admitted": admitted,
+        "processed_tps": processed,
+        "backlog": backlog,
+        "latency_ms": latency,
+        "dropped": dropped,
+        "policy_fired": policy_fired,
+        "overhead_mult": overhead_mult,
+    })
+    final_backlog = float(backlog[-1]) if n else backlog0
+    return frame, final_backlog
 
 
 def simulate_raft(
     feats_with_policy: pd.DataFrame,
     policy_cfg: dict,
-                             
+
     base_capacity_tps: float = 180.0,
     base_offered_per_window: float = 150.0,
     base_latency_ms: float = 120.0,
-) -> pd.DataFrame:
+    out_path: str | None = None,
+    chunk_size: int = 100_000,
+) -> pd.DataFrame | None:
     """
     Per-window discrete simulation (HCIS MVP):
     - offered load is driven by F2 (new IDs) and F3 (burstiness), WITHOUT saturation.
     - consensus overhead is driven by F4 and PQ rotation actions.
     - policy actions affect admission + drop rates.
     - backlog increases latency smoothly.
+
+    With out_path set, results are streamed to parquet in chunk_size row
+    groups (backlog carries across chunks) and None is returned; peak memory
+    for the output stays O(chunk_size) on very long scenarios.
     """
-    effects = policy_cfg.get("action_effects", {})
-    backlog = 0.0
+    effect_table = _build_effect_table(policy_cfg.get("action_effects", {}))
 
-    rows = []
-    for _, r in feats_with_policy.iterrows():
-        f2 = _safe(r.get("F2_new_mmsi_rate", 0.0))
-        f3 = _safe(r.get("F3_message_burstiness", 0.0))
-        f4 = _safe(r.get("F4_position_jump_rate", 0.0))
-
-                                                  
-                                               
-        offered = base_offered_per_window * (
-            1.0
-            + 0.8 * math.log1p(max(0.0, f3))               
-            + 1.2 * max(0.0, f2)                           
+    if out_path is None:
+        frame, _ = _simulate_chunk(
+            feats_with_policy, effect_table,
+            base_capacity_tps, base_offered_per_window, base_latency_ms,
         )
+        return frame
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
 
-                                                                   
-        overhead_mult = 1.0 + 0.6 * min(1.0, max(0.0, f4))                      
-
-                            
-        acts = r.get("policy_actions", []) or []
-        admission_mult = 1.0
-        drop_share = 0.0
-        for a in acts:
-            eff = effects.get(a, {})
-            admission_mult *= float(eff.get("admission_rate_mult", 1.0))
-            overhead_mult *= float(eff.get("consensus_overhead_mult", 1.0))
-
-                                    
-            if "drop_new_mmsi_mult" in eff:
-                drop_share = max(drop_share, 1.0 - float(eff["drop_new_mmsi_mult"]))
-            if "drop_suspicious_mult" in eff:
-                drop_share = max(drop_share, 1.0 - float(eff["drop_suspicious_mult"]))
-
-                                     
-        capacity = base_capacity_tps / max(1e-6, overhead_mult)
-
-                              
-        accepted = offered * admission_mult
-        dropped = accepted * drop_share
-        admitted = max(0.0, accepted - dropped)
-
-                               
-        processed = min(capacity, admitted + backlog)
-        backlog = max(0.0, backlog + admitted - processed)
-
-                                                    
-        latency = base_latency_ms * (1.0 + 0.45 * math.log1p(backlog / max(1.0, base_offered_per_window)))
-
-        rows.append({
-            "window_id": int(r["window_id"]),
-            "offered": offered,
-            "admitted": admitted,
-            "processed_tps": processed,
-            "backlog": backlog,
-            "latency_ms": latency,
-            "dropped": dropped,
-            "policy_fired": bool(r.get("policy_fired", False)),
-            "overhead_mult": overhead_mult,
-        })
-
-    return pd.DataFrame(rows)
+    writer = None
+    backlog = 0.0
+    try:
+        for start in range(0, len(feats_with_policy), int(chunk_size)):
+            chunk = feats_with_policy.iloc[start:start + int(chunk_size)]
+            frame, backlog = _simulate_chunk(
+                chunk, effect_table,
+                base_capacity_tps, base_offered_per_window, base_latency_ms,
+                backlog0=backlog,
+            )
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(out_path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return None
@@ -5,20 +5,18 @@ import pandas as pd
 
 def main():
     s0_dir = "data/processed/busan/s0"
-    feats = pd.read_parquet(os.path.join(s0_dir, "features.parquet"))
 
-                                
     f2 = "F2_new_mmsi_rate"
     f3 = "F3_message_burstiness"
     f4 = "F4_position_jump_rate"
 
-                                    
-    q_f2 = float(feats[f2].quantile(0.999))
-    q_f3 = float(feats[f3].quantile(0.999))
+    feats = pd.read_parquet(os.path.join(s0_dir, "features.parquet"), columns=[f2, f3, f4])
 
-                                                
-                                           
-    q_f4 = float(feats[f4].quantile(0.999))
+    # all three thresholds from one batched quantile call
+    qs = feats[[f2, f3, f4]].quantile(0.999)
+    q_f2 = float(qs[f2])
+    q_f3 = float(qs[f3])
+    q_f4 = float(qs[f4])
 
     policy = {
         "meta": {
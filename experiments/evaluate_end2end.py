@@ -1,15 +1,20 @@
 from __future__ import annotations
 import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import matplotlib.pyplot as plt
 
 from policy.engine import load_policy, apply_policy
 from blockchain_net.simulator import simulate_raft
 
-def _load(processed_dir: str):
-    feats = pd.read_parquet(os.path.join(processed_dir, "features.parquet"))
-    windows = pd.read_parquet(os.path.join(processed_dir, "windows.parquet"))
-    return feats, windows
+def _load_features(processed_dir: str) -> pd.DataFrame:
+    return pd.read_parquet(os.path.join(processed_dir, "features.parquet"))
+
+def _run_scenario(name: str, processed_dir: str, policy: dict):
+    feats = _load_features(processed_dir)
+    feats_pol = apply_policy(feats, policy)
+    sim = simulate_raft(feats_pol, policy)
+    return name, sim
 
 def summarize(sim: pd.DataFrame) -> dict:
     return {
@@ -35,18 +40,20 @@ def main():
 
     summary_rows = []
 
-                               
-    sims = {}
-    for name, pdir in scenarios.items():
-        feats, _ = _load(pdir)
-        feats_pol = apply_policy(feats, policy)
-        sim = simulate_raft(feats_pol, policy)
-        sims[name] = sim
 
+    sims = {}
+    with ProcessPoolExecutor(max_workers=len(scenarios)) as pool:
+        futures = [pool.submit(_run_scenario, name, pdir, policy) for name, pdir in scenarios.items()]
+        for fut in futures:
+            name, sim = fut.result()
+            sims[name] = sim
+
+    for name in scenarios:
+        sim = sims[name]
         row = {"scenario": name, **summarize(sim)}
         summary_rows.append(row)
 
-                           
+
         sim.to_csv(f"results/tables/sim_{name}.csv", index=False)
 
     summary = pd.DataFrame(summary_rows)
@@ -1,6 +1,44 @@
 import numpy as np
 import pandas as pd
 
+
+def _pick_one_pair_per_mmsi(out: pd.DataFrame, cand_mask: np.ndarray, rng) -> np.ndarray:
+    """Pick one random candidate row per MMSI; returns positional indices into out."""
+    cand_pos = np.flatnonzero(cand_mask)
+    mmsi_arr = out["mmsi"].to_numpy()
+    shuffled = cand_pos[rng.permutation(cand_pos.size)]
+    _, first = np.unique(mmsi_arr[shuffled], return_index=True)
+    return shuffled[first]
+
+
+def _plan_flood_sampling(target: pd.DataFrame, intensity: float, msgs_per_new: int, rng):
+    """
+    Per-window new-MMSI budgets plus source-row gather indices, computed in a
+    single groupby pass. Returns (all_idx, n_windows, total_new_mmsi).
+    """
+    grouped = target.groupby("window_id", sort=True)
+    base_unique = grouped["mmsi"].nunique()
+    n_new_per_window = np.maximum(1, np.round(base_unique.to_numpy() * float(intensity)).astype(np.int64))
+    target_pos = target.index.to_numpy()
+    pools = grouped.indices
+
+    gather_chunks = []
+    for win_id, n_new in zip(base_unique.index, n_new_per_window):
+        pool = target_pos[pools[win_id]]
+        draws = rng.integers(0, pool.size, size=int(n_new) * msgs_per_new)
+        gather_chunks.append(pool[draws])
+    all_idx = np.concatenate(gather_chunks)
+    return all_idx, len(n_new_per_window), int(n_new_per_window.sum())
+
+
+def _apply_lat_jumps(out: pd.DataFrame, picked_pos: np.ndarray, jump_deg: float, rng) -> None:
+    """Shift lat at picked positions by +-jump_deg in one vectorized assignment."""
+    jumps = np.where(rng.random(picked_pos.size) < 0.5, -jump_deg, jump_deg)
+    lat_arr = out["lat"].to_numpy().copy()
+    lat_arr[picked_pos] += jumps
+    out["lat"] = lat_arr
+
+
 def inject_s2_position_jump(
     df: pd.DataFrame,
     intensity: float,
@@ -14,7 +52,7 @@ def inject_s2_position_jump(
     - i+1 포인트의 위치를 크게 이동시킨다.
     """
     rng = np.random.default_rng(seed)
-    out = df.sort_values(["mmsi", "ts"]).copy()
+    out = df.sort_values(["mmsi", "ts"])
 
                         
     counts = out["mmsi"].value_counts()
@@ -23,45 +61,21 @@ def inject_s2_position_jump(
     n_select = max(1, int(len(valid_mmsi) * float(intensity)))
     chosen = rng.choice(valid_mmsi, size=n_select, replace=False)
 
-    jump_deg = float(jump_distance_km) / 111.0                      
-
-    modified = 0
-    skipped_no_pair = 0
-
-    for mmsi in chosen:
-        sub = out[out["mmsi"] == mmsi]
-        if len(sub) < 2:
-            continue
+    jump_deg = float(jump_distance_km) / 111.0
 
-                                   
-        ts = sub["ts"].to_numpy()
-        dt = (ts[1:] - ts[:-1]) / np.timedelta64(1, "s")           
 
-               
-        cand_pos = np.where((dt > 0) & (dt <= max_dt_seconds))[0]         
-        if len(cand_pos) == 0:
-            skipped_no_pair += 1
-            continue
+    dt = out.groupby("mmsi")["ts"].diff().dt.total_seconds().to_numpy()
+    cand_mask = (dt > 0) & (dt <= max_dt_seconds) & out["mmsi"].isin(chosen).to_numpy()
 
-        i = int(rng.choice(cand_pos))
-        idx_i = sub.index[i]
-        idx_j = sub.index[i + 1]                   
+    picked_pos = _pick_one_pair_per_mmsi(out, cand_mask, rng)
+    _apply_lat_jumps(out, picked_pos, jump_deg, rng)
 
-                               
-        out.at[idx_j, "lat"] = float(out.at[idx_j, "lat"]) + rng.choice([-1, 1]) * jump_deg
-        modified += 1
+    modified = int(picked_pos.size)
+    skipped_no_pair = n_select - modified
 
     print(f"[S2] selected_mmsi={n_select}, modified_pairs={modified}, skipped_no_pair={skipped_no_pair}")
     return out
 
-def _sample_point_in_bbox(rng, bbox):
-                                                 
-    min_lon, min_lat, max_lon, max_lat = map(float, bbox)
-    lon = rng.uniform(min_lon, max_lon)
-    lat = rng.uniform(min_lat, max_lat)
-    return lon, lat
-
-
 def _make_hotspot_bbox(bbox, shrink=0.2):
                         
     min_lon, min_lat, max_lon, max_lat = map(float, bbox)
@@ -92,7 +106,7 @@ def inject_s1_identity_flood(
     - message_multiplier로 신규 MMSI 당 메시지 수를 늘림(버스트 유도)
     """
     rng = np.random.default_rng(seed)
-    out = df.copy()
+    out = df
 
     if "window_id" not in out.columns:
         raise KeyError("S1 injection requires 'window_id' (run after windowing).")
@@ -104,53 +118,35 @@ def inject_s1_identity_flood(
 
                
     wmask = (out["window_id"] >= int(start_window)) & (out["window_id"] <= int(end_window))
-    target = out.loc[wmask].copy()
+    target = out.loc[wmask]
     if target.empty:
         print("[S1] target window range has no rows; skip injection.")
         return out
 
-                            
-    max_mmsi = int(pd.to_numeric(out["mmsi"], errors="coerce").fillna(0).max())
-    next_mmsi = max_mmsi + 1
 
-                                        
-    msgs_per_new = max(1, int(round(float(message_multiplier))))
+    max_mmsi = out.attrs.get("max_mmsi")
+    if max_mmsi is None:
+        max_mmsi = int(pd.to_numeric(out["mmsi"], errors="coerce").fillna(0).max())
+    next_mmsi = int(max_mmsi) + 1
 
-    injected_rows = []
-    modified_windows = 0
-    total_new_mmsi = 0
-    total_new_msgs = 0
 
-                      
-    for win_id, grp in target.groupby("window_id", sort=True):
-        base_unique = int(grp["mmsi"].nunique())
-        n_new = max(1, int(round(base_unique * float(intensity))))
-        modified_windows += 1
-        total_new_mmsi += n_new
-
-                                     
-                                        
-        for _ in range(n_new):
-            new_id = next_mmsi
-            next_mmsi += 1
+    msgs_per_new = max(1, int(round(float(message_multiplier))))
 
-                                    
-            sample_idx = rng.choice(grp.index.to_numpy(), size=msgs_per_new, replace=True)
-            samp = out.loc[sample_idx].copy()
 
-            samp["mmsi"] = int(new_id)
-                                             
-                                                           
-            lon, lat = _sample_point_in_bbox(rng, bbox)
-            samp["lon"] = lon
-            samp["lat"] = lat
+    all_idx, modified_windows, total_new_mmsi = _plan_flood_sampling(target, intensity, msgs_per_new, rng)
+    total_new_msgs = total_new_mmsi * msgs_per_new
 
-            injected_rows.append(samp)
-            total_new_msgs += len(samp)
+    new_ids = np.arange(next_mmsi, next_mmsi + total_new_mmsi).astype(str)
+    min_lon, min_lat, max_lon, max_lat = map(float, bbox)
+    samp = out.loc[all_idx].assign(
+        mmsi=np.repeat(new_ids, msgs_per_new),
+        lon=np.repeat(rng.uniform(min_lon, max_lon, size=total_new_mmsi), msgs_per_new),
+        lat=np.repeat(rng.uniform(min_lat, max_lat, size=total_new_mmsi), msgs_per_new),
+    )
 
-    if injected_rows:
-        inj = pd.concat(injected_rows, ignore_index=True)
-        out = pd.concat([out, inj], ignore_index=True)
+    out = pd.concat([out, samp], ignore_index=True)
+    if isinstance(df["mmsi"].dtype, pd.CategoricalDtype):
+        out["mmsi"] = out["mmsi"].astype("category")
 
     print(
         f"[S1] windows={modified_windows}, new_mmsi={total_new_mmsi}, "
@@ -178,36 +174,18 @@ def inject_s3_hybrid(
     - Part B (S2-like): apply position-jump on a fraction of EXISTING MMSIs, but only on pairs whose later point falls in the window range.
     """
     rng = np.random.default_rng(seed)
-    out = df.copy()
+    out = df
 
     if "window_id" not in out.columns:
         raise KeyError("S3 injection requires 'window_id' (run after windowing).")
     if not {"mmsi", "ts", "lat", "lon"}.issubset(out.columns):
         raise KeyError("df must contain mmsi, ts, lat, lon")
 
-                                           
-    def _sample_point_in_bbox(_bbox):
-        min_lon, min_lat, max_lon, max_lat = map(float, _bbox)
-        lon = rng.uniform(min_lon, max_lon)
-        lat = rng.uniform(min_lat, max_lat)
-        return lon, lat
-
-    def _make_hotspot_bbox(_bbox, shrink=0.2):
-        min_lon, min_lat, max_lon, max_lat = map(float, _bbox)
-        dx = (max_lon - min_lon)
-        dy = (max_lat - min_lat)
-        return [
-            min_lon + dx * shrink,
-            min_lat + dy * shrink,
-            max_lon - dx * shrink,
-            max_lat - dy * shrink,
-        ]
-
                                        
     w0 = int(start_window)
     w1 = int(end_window)
     wmask = (out["window_id"] >= w0) & (out["window_id"] <= w1)
-    target = out.loc[wmask].copy()
+    target = out.loc[wmask]
 
     if target.empty:
         print("[S3] target window range has no rows; skip injection.")
@@ -221,79 +199,61 @@ def inject_s3_hybrid(
                                                                   
                                                                       
                                                                   
-    max_mmsi = int(pd.to_numeric(out["mmsi"], errors="coerce").fillna(0).max())
-    next_mmsi = max_mmsi + 1
+    max_mmsi = out.attrs.get("max_mmsi")
+    if max_mmsi is None:
+        max_mmsi = int(pd.to_numeric(out["mmsi"], errors="coerce").fillna(0).max())
+    next_mmsi = int(max_mmsi) + 1
 
                                                         
     msgs_per_new = max(1, int(round(float(message_multiplier))))
 
-    injected_rows = []
-    modified_windows = 0
-    total_new_mmsi = 0
-    total_new_msgs = 0
-
-    for win_id, grp in target.groupby("window_id", sort=True):
-        base_unique = int(grp["mmsi"].nunique())
-        n_new = max(1, int(round(base_unique * float(intensity))))
-        modified_windows += 1
-        total_new_mmsi += n_new
-
-        for _ in range(n_new):
-            new_id = next_mmsi
-            next_mmsi += 1
-
-            sample_idx = rng.choice(grp.index.to_numpy(), size=msgs_per_new, replace=True)
-            samp = out.loc[sample_idx].copy()
+    all_idx, modified_windows, total_new_mmsi = _plan_flood_sampling(target, intensity, msgs_per_new, rng)
+    total_new_msgs = total_new_mmsi * msgs_per_new
 
-            samp["mmsi"] = int(new_id)
-            lon, lat = _sample_point_in_bbox(bbox)
-            samp["lon"] = lon
-            samp["lat"] = lat
-
-            injected_rows.append(samp)
-            total_new_msgs += len(samp)
+    new_ids = np.arange(next_mmsi, next_mmsi + total_new_mmsi).astype(str)
+    min_lon, min_lat, max_lon, max_lat = map(float, bbox)
+    samp = out.loc[all_idx].assign(
+        mmsi=np.repeat(new_ids, msgs_per_new),
+        lon=np.repeat(rng.uniform(min_lon, max_lon, size=total_new_mmsi), msgs_per_new),
+        lat=np.repeat(rng.uniform(min_lat, max_lat, size=total_new_mmsi), msgs_per_new),
+    )
 
-    if injected_rows:
-        inj = pd.concat(injected_rows, ignore_index=True)
-        out = pd.concat([out, inj], ignore_index=True)
+    out = pd.concat([out, samp], ignore_index=True)
+    if isinstance(df["mmsi"].dtype, pd.CategoricalDtype):
+        out["mmsi"] = out["mmsi"].astype("category")
 
                                                                   
                                                        
                                                                                   
                                                                   
-    out = out.sort_values(["mmsi", "ts"]).copy()
+    out = out.sort_values(["mmsi", "ts"])
 
                                                                    
-    exist_mmsi = target["mmsi"].value_counts().index.to_numpy()
+    # value_counts on categorical mmsi lists every category in the dataset;
+    # keep only identities actually observed in the window range.
+    exist_counts = target["mmsi"].value_counts()
+    exist_mmsi = exist_counts.index[exist_counts > 0].to_numpy()
     n_affect = max(1, int(len(exist_mmsi) * float(affect_existing_fraction)))
     chosen = rng.choice(exist_mmsi, size=n_affect, replace=False)
 
     jump_deg = float(jump_distance_km) / 111.0
 
-    modified_pairs = 0
-    skipped_no_pair = 0
-
-    for mmsi in chosen:
-        sub = out[out["mmsi"] == mmsi]
-        if len(sub) < 2:
-            continue
 
-                                                        
-        ts = sub["ts"].to_numpy()
-        dt = (ts[1:] - ts[:-1]) / np.timedelta64(1, "s")
-
-        win_next = sub["window_id"].to_numpy()[1:]                    
-        cand_pos = np.where((dt > 0) & (dt <= max_dt_seconds) & (win_next >= w0) & (win_next <= w1))[0]
-
-        if len(cand_pos) == 0:
-            skipped_no_pair += 1
-            continue
+    dt = out.groupby("mmsi")["ts"].diff().dt.total_seconds().to_numpy()
+    win_next = out["window_id"].to_numpy()
+    cand_mask = (
+        (dt > 0)
+        & (dt <= max_dt_seconds)
+        & (win_next >= w0)
+        & (win_next <= w1)
+        & out["mmsi"].isin(chosen).to_numpy()
+    )
 
-        i = int(rng.choice(cand_pos))
-        idx_j = sub.index[i + 1]         
+    picked_pos = _pick_one_pair_per_mmsi(out, cand_mask, rng)
+    _apply_lat_jumps(out, picked_pos, jump_deg, rng)
 
-        out.at[idx_j, "lat"] = float(out.at[idx_j, "lat"]) + rng.choice([-1, 1]) * jump_deg
-        modified_pairs += 1
+    modified_pairs = int(picked_pos.size)
+    skipped_no_pair = n_affect - modified_pairs
 
     print(
         f"[S3] windows={modified_windows}, new_mmsi={total_new_mmsi}, new_msgs={total_new_msgs}, "
@@ -8,7 +8,10 @@ import matplotlib.pyplot as plt
 
 
 def load_f4(processed_dir: str) -> np.ndarray:
-    feats = pd.read_parquet(os.path.join(processed_dir, "features.parquet"))
+    feats = pd.read_parquet(
+        os.path.join(processed_dir, "features.parquet"),
+        columns=["F4_position_jump_rate"],
+    )
     return feats["F4_position_jump_rate"].to_numpy()
 
 
@@ -28,11 +31,13 @@ def main():
 
     os.makedirs("results/figures", exist_ok=True)
 
-                  
+    # read each features.parquet once, reuse across all three plots
+    f4_by_run = {label: load_f4(pdir) for label, pdir in runs}
+
+
     plt.figure()
-    for label, pdir in runs:
-        f4 = load_f4(pdir)
-        plt.hist(f4, bins=50, alpha=0.4, label=label)          
+    for label, f4 in f4_by_run.items():
+        plt.hist(f4, bins=50, alpha=0.4, label=label)
     plt.xlabel("F4_position_jump_rate")
     plt.ylabel("Count")
     plt.legend()
@@ -42,8 +47,7 @@ def main():
 
                    
     plt.figure()
-    for label, pdir in runs:
-        f4 = load_f4(pdir)
+    for label, f4 in f4_by_run.items():
         x, y = ecdf(f4)
         plt.plot(x, y, label=label)
     plt.xlabel("F4_position_jump_rate")
@@ -56,8 +60,7 @@ def main():
                                                   
     labels = []
     ratios = []
-    for label, pdir in runs:
-        f4 = load_f4(pdir)
+    for label, f4 in f4_by_run.items():
         ratio = float((f4 > 0).mean())
         labels.append(label)
         ratios.append(ratio)
@@ -13,7 +13,6 @@ import os
 import json
 import argparse
 import copy
-import yaml
 import pandas as pd
 
 from preprocess.load_and_map_schema import load_and_prepare
@@ -23,6 +22,7 @@ from preprocess.grid_mapping import add_grid_indices
 from preprocess.feature_extraction import compute_features
 from preprocess.discretize_quantiles import fit_quantiles, apply_quantiles
 from preprocess.encode_onehot import onehot_levels
+from utils.io import load_yaml
 
             
 from experiments.inject_spoofing import (
@@ -33,14 +33,22 @@ from experiments.inject_spoofing import (
 
 
 def load_config(path: str) -> dict:
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    return load_yaml(path)
 
 
 def ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
 
 
+def write_parquet(df: pd.DataFrame, path: str):
+    """Write a processed table with explicit codec/row-group settings.
+
+    Bounded row groups keep downstream column-pruned and batched readers
+    (collect_f4_stats, plot scripts) from having to scan whole files.
+    """
+    df.to_parquet(path, index=False, compression="snappy", row_group_size=1_000_000)
+
+
 def build_windows_table(df: pd.DataFrame, dt_minutes: int) -> pd.DataFrame:
     """
     Build window metadata table:
@@ -71,8 +79,6 @@ def select_normal_features_for_fit(
     disc_cfg = cfg.get("discretization", {})
     fit_on = disc_cfg.get("fit_on", "clean")
 
-    feats2 = feats.merge(windows, on="window_id", how="left")
-
     if fit_on == "explicit_range":
         nr = disc_cfg.get("normal_range", {}) or {}
         start_ts = nr.get("start_ts")
@@ -83,19 +89,55 @@ def select_normal_features_for_fit(
         start = pd.to_datetime(start_ts, utc=True)
         end = pd.to_datetime(end_ts, utc=True)
 
-        feats_fit = feats2[(feats2["ts_start"] >= start) & (feats2["ts_end"] <= end)].copy()
+        # Prune on the small windows table first, then select features by window_id;
+        # avoids merging ts_start/ts_end onto the full feature frame and copying it.
+        win_sel = windows.loc[(windows["ts_start"] >= start) & (windows["ts_end"] <= end), "window_id"]
+        feats_fit = feats[feats["window_id"].isin(win_sel)]
         if feats_fit.empty:
             raise ValueError("No windows selected for explicit normal_range. Check start_ts/end_ts or data coverage.")
-        return feats_fit.drop(columns=["ts_start", "ts_end"])
+        return feats_fit
+
 
-                              
     return feats
 
 
 def main(cfg_path: str = "configs/default.yaml", ports_path: str = "ports/ports.yaml"):
     cfg = load_config(cfg_path)
+    run(cfg, ports_path)
+
+
+def _scenario_config(base_cfg: dict, scenario: str) -> dict:
+    """Derive a per-scenario config: injection toggle + scenario-suffixed output dirs."""
+    cfg = copy.deepcopy(base_cfg)
+    cfg["experiments"]["enable_injection"] = scenario != "S0"
+    cfg["experiments"]["scenario"] = scenario
+
+    suffix = scenario.lower()
+    cfg["project"]["processed_dir"] = os.path.join("data", "processed", cfg["project"]["port"], suffix)
+    cfg["project"]["artifacts_dir"] = os.path.join(base_cfg["project"].get("artifacts_dir", "artifacts"), suffix)
+    return cfg
+
+
+def _run_scenario(scenario: str, cfg_path: str, ports_path: str):
+    cfg = _scenario_config(load_config(cfg_path), scenario)
+    print(f"\n=== RUN scenario {scenario} -> {cfg['project']['processed_dir']} ===")
+    run(cfg, ports_path)
+    return scenario
+
+
+def run_scenarios(scenarios, cfg_path: str = "configs/default.yaml", ports_path: str = "ports/ports.yaml"):
+    """Run several independent scenarios concurrently (one process each)."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=len(scenarios)) as pool:
+        futures = [pool.submit(_run_scenario, s, cfg_path, ports_path) for s in scenarios]
+        for fut in futures:
+            print(f"[scenarios] done: {fut.result()}")
+
+
+def run(cfg: dict, ports_path: str = "ports/ports.yaml"):
+
 
-                       
     proc_dir = cfg["project"]["processed_dir"]
     art_dir = cfg["project"].get("artifacts_dir", "artifacts")
     ensure_dir(proc_dir)
@@ -106,8 +148,15 @@ def main(cfg_path: str = "configs/default.yaml", ports_path: str = "ports/ports.
         csv_path=cfg["project"]["raw_path"],
         mapping_dict=cfg["schema_mapping"],
         tz_hint=cfg["time"].get("timezone", "UTC"),
+        ts_format=cfg["time"].get("ts_format"),
     )
 
+    # Cache the numeric mmsi ceiling once; injectors allocate new ids above it
+    # without re-parsing the full column. sanitize returns mmsi as categorical,
+    # so only the (few) categories need parsing.
+    cats = pd.Series(df["mmsi"].cat.categories)
+    df.attrs["max_mmsi"] = int(pd.to_numeric(cats, errors="coerce").fillna(0).max())
+
                          
     df = filter_by_port(
         df,
@@ -210,10 +259,10 @@ def main(cfg_path: str = "configs/default.yaml", ports_path: str = "ports/ports.
     onehot = onehot_levels(feats_disc, feature_order)
 
                                  
-    windows.to_parquet(os.path.join(proc_dir, "windows.parquet"), index=False)
-    feats.to_parquet(os.path.join(proc_dir, "features.parquet"), index=False)
-    feats_disc.to_parquet(os.path.join(proc_dir, "features_discrete.parquet"), index=False)
-    onehot.to_parquet(os.path.join(proc_dir, "onehot.parquet"), index=False)
+    write_parquet(windows, os.path.join(proc_dir, "windows.parquet"))
+    write_parquet(feats, os.path.join(proc_dir, "features.parquet"))
+    write_parquet(feats_disc, os.path.join(proc_dir, "features_discrete.parquet"))
+    write_parquet(onehot, os.path.join(proc_dir, "onehot.parquet"))
 
                          
     disc_dir = os.path.join(art_dir, "discretization")
@@ -239,5 +288,13 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", type=str, default="configs/default.yaml")
     parser.add_argument("--ports", type=str, default="ports/ports.yaml")
+    parser.add_argument(
+        "--scenarios", type=str, default=None,
+        help="comma-separated scenarios to run in parallel, e.g. S0,S1,S2,S3",
+    )
     args = parser.parse_args()
-    main(cfg_path=args.config, ports_path=args.ports)
+    if args.scenarios:
+        run_scenarios([s.strip() for s in args.scenarios.split(",") if s.strip()],
+                      cfg_path=args.config, ports_path=args.ports)
+    else:
+        main(cfg_path=args.config, ports_path=args.ports)
@@ -3,15 +3,15 @@ from __future__ import annotations
 
 import os
 import copy
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
 import yaml
+import numpy as np
 import pandas as pd
 
 from experiments.run_pipeline import main as run_pipeline_main
-
-
-def load_yaml(path: str) -> dict:
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+from utils.io import load_yaml
 
 
 def save_yaml(cfg: dict, path: str):
@@ -20,60 +20,90 @@ def save_yaml(cfg: dict, path: str):
         yaml.safe_dump(cfg, f, sort_keys=False, allow_unicode=True)
 
 
-def collect_f4_stats(processed_dir: str) -> dict:
+def collect_f4_stats(processed_dir: str, batch_size: int = 100_000) -> dict:
+    """Summarize F4 over features.parquet with streaming reductions.
+
+    With pyarrow present the file is read batch by batch, keeping peak
+    memory at O(batch_size) instead of O(rows).
+    """
     feats_path = os.path.join(processed_dir, "features.parquet")
-    feats = pd.read_parquet(feats_path)
-    f4 = feats["F4_position_jump_rate"]
+    cols = ["window_id", "F4_position_jump_rate"]
+    try:
+        from pyarrow.parquet import ParquetFile
+    except ImportError:
+        feats = pd.read_parquet(feats_path, columns=cols)
+        f4 = feats["F4_position_jump_rate"]
+        total_windows = int(feats["window_id"].nunique())
+        f4_pos_windows = int((f4 > 0).sum())
+        f4_sum = float(f4.sum())
+        f4_count = int(f4.count())
+        f4_max = float(f4.max()) if f4_count else float("nan")
+    else:
+        windows = set()
+        f4_pos_windows = 0
+        f4_sum = 0.0
+        f4_count = 0
+        f4_max = float("-inf")
+        for batch in ParquetFile(feats_path).iter_batches(columns=cols, batch_size=batch_size):
+            wid = batch.column("window_id").to_numpy()
+            f4b = batch.column("F4_position_jump_rate").to_numpy()
+            windows.update(np.unique(wid).tolist())
+            f4_pos_windows += int((f4b > 0).sum())
+            f4_sum += float(f4b.sum())
+            f4_count += f4b.size
+            if f4b.size:
+                f4_max = max(f4_max, float(f4b.max()))
+        total_windows = len(windows)
+        if not f4_count:
+            f4_max = float("nan")
 
-    total_windows = int(feats["window_id"].nunique())
-    f4_pos_windows = int((f4 > 0).sum())
     ratio = f4_pos_windows / total_windows if total_windows > 0 else 0.0
-
     return {
         "processed_dir": processed_dir,
         "total_windows": total_windows,
         "f4_pos_windows": f4_pos_windows,
         "f4_pos_ratio": ratio,
-        "f4_mean": float(f4.mean()),
-        "f4_max": float(f4.max()),
+        "f4_mean": f4_sum / f4_count if f4_count else float("nan"),
+        "f4_max": f4_max,
     }
 
 
+def _run_one(d_km: float, base_cfg: dict, ports_path: str) -> dict:
+    """Run the S2 pipeline for one jump distance and return its F4 stats."""
+    cfg = copy.deepcopy(base_cfg)
+
+    cfg["experiments"]["enable_injection"] = True
+    cfg["experiments"]["scenario"] = "S2"
+    cfg["experiments"]["S2"]["jump_distance_km"] = float(d_km)
+
+    suffix = f"s2_jump_{int(d_km)}km"
+    cfg["project"]["processed_dir"] = os.path.join("data", "processed", cfg["project"]["port"], suffix)
+    cfg["project"]["results_dir"] = os.path.join("results", suffix)
+    cfg["project"]["artifacts_dir"] = os.path.join("artifacts", suffix)
+
+    tmp_cfg_path = os.path.join("configs", "experiments", f"{suffix}.yaml")
+    save_yaml(cfg, tmp_cfg_path)
+
+    print(f"\n=== RUN: {suffix} ===")
+    run_pipeline_main(cfg_path=tmp_cfg_path, ports_path=ports_path)
+
+    return collect_f4_stats(cfg["project"]["processed_dir"])
+
+
 def main():
     base_cfg_path = "configs/default.yaml"
     ports_path = "ports/ports.yaml"
 
     base_cfg = load_yaml(base_cfg_path)
 
-                   
-    distances = [10.0, 30.0, 80.0]
-
-    out_rows = []
-    for d_km in distances:
-        cfg = copy.deepcopy(base_cfg)
-
-                
-        cfg["experiments"]["enable_injection"] = True
-        cfg["experiments"]["scenario"] = "S2"
-        cfg["experiments"]["S2"]["jump_distance_km"] = float(d_km)
 
-                            
-        suffix = f"s2_jump_{int(d_km)}km"
-        cfg["project"]["processed_dir"] = os.path.join("data", "processed", cfg["project"]["port"], suffix)
-        cfg["project"]["results_dir"] = os.path.join("results", suffix)
-        cfg["project"]["artifacts_dir"] = os.path.join("artifacts", suffix)
-
-                                    
-        tmp_cfg_path = os.path.join("configs", "experiments", f"{suffix}.yaml")
-        save_yaml(cfg, tmp_cfg_path)
+    distances = [10.0, 30.0, 80.0]
 
-        print(f"\n=== RUN: {suffix} ===")
-        run_pipeline_main(cfg_path=tmp_cfg_path, ports_path=ports_path)
+    # The per-distance runs are independent; fan them out across processes.
+    with ProcessPoolExecutor(max_workers=len(distances)) as ex:
+        out_rows = list(ex.map(_run_one, distances, repeat(base_cfg), repeat(ports_path)))
 
-                  
-        out_rows.append(collect_f4_stats(cfg["project"]["processed_dir"]))
 
-              
     df = pd.DataFrame(out_rows)
     os.makedirs("results/tables", exist_ok=True)
     df.to_csv("results/tables/s2_sweep_summary.csv", index=False)
@@ -1,90 +1,103 @@
 from __future__ import annotations
-import yaml
+import numpy as np
 import pandas as pd
 
+from utils.io import load_yaml
+
+# Comparator table: op string -> C-level ufunc applied to whole columns
 OPS = {
-    ">":  lambda a, b: a > b,
-    ">=": lambda a, b: a >= b,
-    "<":  lambda a, b: a < b,
-    "<=": lambda a, b: a <= b,
-    "==": lambda a, b: a == b,
-    "!=": lambda a, b: a != b,
+    ">":  np.greater,
+    ">=": np.greater_equal,
+    "<":  np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
 }
 
 def load_policy(path: str = "policy/policy_table.yaml") -> dict:
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    return load_yaml(path)
 
-def _eval_clause(row: pd.Series, clause: dict, thresholds: dict) -> bool:
-    feat = clause.get("feature")
-    op = clause.get("op")
+def _compile_clause(clause: dict, thresholds: dict):
+    """Resolve a feature clause to (feature, comparator ufunc, threshold) once."""
     if "threshold_key" in clause:
         b = float(thresholds[clause["threshold_key"]])
     else:
         b = float(clause.get("value"))
-    a = float(row.get(feat, 0.0))
-    return OPS[op](a, b)
+    return clause.get("feature"), OPS[clause.get("op")], b
+
+
+def _clause_mask(feats: pd.DataFrame, compiled: tuple, n: int) -> np.ndarray:
+    """Evaluate one compiled clause against the whole frame as a bool ndarray."""
+    feat, cmp, b = compiled
+    if feat in feats.columns:
+        a = feats[feat].to_numpy(dtype=np.float64)
+    else:
+        a = np.zeros(n)
+    return cmp(a, b)
 
 def apply_policy(feats: pd.DataFrame, policy: dict) -> pd.DataFrame:
     thresholds = policy.get("thresholds", {})
     rules = policy.get("rules", [])
+    n = len(feats)
 
-                                 
-    rule_fired = {r["id"]: [False]*len(feats) for r in rules}
-
-    actions_out = []
-    explain_out = []
+    rule_fired = {r["id"]: np.zeros(n, dtype=bool) for r in rules}
 
-                                                                              
-                                           
+    # Pass 1: feature-only rules; pass 2: rules referencing other rules.
+    # Each clause is evaluated once over the full column instead of per row.
     for pass_id in [1, 2]:
-        for ri, r in enumerate(rules):
+        for r in rules:
             rid = r["id"]
             cond = r.get("if", {})
-            has_dep = "rule" in str(cond)                
+            has_dep = "rule" in str(cond)
             if pass_id == 1 and has_dep:
                 continue
             if pass_id == 2 and not has_dep:
                 continue
 
-            fired_list = []
-            for i, row in feats.iterrows():
-                fired = True
-                if "any" in cond:
-                    fired = any(_eval_clause(row, c, thresholds) for c in cond["any"])
-                elif "all" in cond:
-                    fired = all(
-                        (_eval_clause(row, c, thresholds) if "feature" in c else rule_fired[c["rule"]][i])
-                        for c in cond["all"]
-                    )
-                else:
-                    fired = False
-                fired_list.append(bool(fired))
-            rule_fired[rid] = fired_list
+            if "any" in cond:
+                masks = [_clause_mask(feats, _compile_clause(c, thresholds), n) for c in cond["any"]]
+                fired = np.logical_or.reduce(masks) if masks else np.zeros(n, dtype=bool)
+            elif "all" in cond:
+                masks = [
+                    (_clause_mask(feats, _compile_clause(c, thresholds), n) if "feature" in c
+                     else rule_fired[c["rule"]])
+                    for c in cond["all"]
+                ]
+                fired = np.logical_and.reduce(masks) if masks else np.ones(n, dtype=bool)
+            else:
+                fired = np.zeros(n, dtype=bool)
+            rule_fired[rid] = fired
 
-                                                      
     rules_sorted = sorted(rules, key=lambda r: int(r.get("priority", 0)))
-    for i, row in feats.iterrows():
-        fired_rules = [r for r in rules_sorted if rule_fired[r["id"]][i]]
-                       
+    fired_matrix = (
+        np.column_stack([rule_fired[r["id"]] for r in rules_sorted])
+        if rules_sorted else np.zeros((n, 0), dtype=bool)
+    )
+
+    policy_fired = fired_matrix.any(axis=1)
+
+    # Per-rule lookups resolved once; rows with no fired rule keep empty
+    # outputs, so assembly only walks the (typically few) fired rows.
+    rule_actions = [list(r.get("then", [])) for r in rules_sorted]
+    rule_explain = [{"rule": r["id"], "why": r.get("explain", "")} for r in rules_sorted]
+
+    actions_out = [[] for _ in range(n)]
+    explain_out = [[] for _ in range(n)]
+    for i in np.flatnonzero(policy_fired):
         acts = []
         expl = []
-        for r in fired_rules:
-            acts.extend(list(r.get("then", [])))
-            expl.append({"rule": r["id"], "why": r.get("explain", "")})
-                                   
         seen = set()
-        acts_u = []
-        for a in acts:
-            if a not in seen:
-                seen.add(a)
-                acts_u.append(a)
-
-        actions_out.append(acts_u)
-        explain_out.append(expl)
+        for j in np.flatnonzero(fired_matrix[i]):
+            for a in rule_actions[j]:
+                if a not in seen:
+                    seen.add(a)
+                    acts.append(a)
+            expl.append(rule_explain[j])
+        actions_out[i] = acts
+        explain_out[i] = expl
 
     out = feats.copy()
     out["policy_actions"] = actions_out
     out["policy_explain"] = explain_out
-    out["policy_fired"] = [len(a) > 0 for a in actions_out]
+    out["policy_fired"] = policy_fired
     return out
@@ -4,6 +4,8 @@ Discretize continuous features into L/M/H using quantiles.
 from __future__ import annotations
 
 from typing import Dict, Iterable
+
+import numpy as np
 import pandas as pd
 
 
@@ -29,21 +31,20 @@ def fit_quantiles(df: pd.DataFrame, q_low: float, q_high: float) -> Dict[str, Di
 
 
 def apply_quantiles(df: pd.DataFrame, thresholds: Dict[str, Dict[str, float]]) -> pd.DataFrame:
-    df = df.copy()
+    # Shallow copy: we only append level columns, no need to duplicate data
+    df = df.copy(deep=False)
     for col, th in thresholds.items():
         low, high = th["low"], th["high"]
         level_col = f"level_{col}"
+        vals = df[col].to_numpy(dtype=np.float64)
         if pd.isna(low) or pd.isna(high) or low >= high:
-            # Fallback for constant/degenerate distributions
-            levels = pd.Series("M", index=df.index)
-            levels[df[col] < low] = "L"
-            levels[df[col] > high] = "H"
-            df[level_col] = levels
+            # Fallback for constant/degenerate distributions: default M
+            codes = np.ones(len(vals), dtype=np.int8)
+            codes[vals < low] = 0
+            codes[vals > high] = 2
         else:
-            df[level_col] = pd.cut(
-                df[col],
-                bins=[-float("inf"), low, high, float("inf")],
-                labels=["L", "M", "H"],
-                include_lowest=True,
-            )
+            # 0/1/2 bucket per threshold crossing: <=low -> L, <=high -> M, else H
+            codes = (vals > low).astype(np.int8) + (vals > high).astype(np.int8)
+            codes[np.isnan(vals)] = -1
+        df[level_col] = pd.Categorical.from_codes(codes, categories=["L", "M", "H"], ordered=True)
     return df
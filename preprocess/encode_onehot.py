@@ -4,29 +4,52 @@ One-hot encode discretized feature levels (L/M/H) into binary vectors.
 from __future__ import annotations
 
 from typing import Iterable, List
+
+import numpy as np
 import pandas as pd
 
+LEVELS = ["L", "M", "H"]
+
 
 def onehot_levels(df: pd.DataFrame, feature_order: Iterable[str]) -> pd.DataFrame:
-    df = df.copy()
     out_cols: List[str] = []
+    blocks: List[np.ndarray] = []
+    eye = np.eye(len(LEVELS), dtype=np.uint8)
 
     for feat in feature_order:
         level_col = f"level_{feat}"
         if level_col not in df.columns:
             raise KeyError(f"Missing discretized column: {level_col}")
-        dummies = pd.get_dummies(df[level_col], prefix=feat)
-        # Ensure all three levels exist
-        for lvl in ["L", "M", "H"]:
-            col_name = f"{feat}_{lvl}"
-            if col_name not in dummies:
-                dummies[col_name] = 0
-        dummies = dummies[[f"{feat}_L", f"{feat}_M", f"{feat}_H"]]
-        out_cols.extend(dummies.columns.tolist())
-        df = pd.concat([df, dummies], axis=1)
-
-    keep_cols = ["window_id"] + out_cols
-    out = df[keep_cols].copy()
-    for c in out_cols:
-        out[c] = out[c].astype(int)
+        codes = (
+            pd.Categorical(df[level_col], categories=LEVELS).codes.astype(np.intp)
+        )
+        # eye lookup gives the (N, 3) block directly; code -1 (NaN level) wraps
+        # to the last row, so zero those rows out explicitly.
+        block = eye[codes]
+        block[codes < 0] = 0
+        blocks.append(block)
+        out_cols.extend(f"{feat}_{lvl}" for lvl in LEVELS)
+
+    out = pd.DataFrame(np.hstack(blocks), columns=out_cols, index=df.index)
+    out.insert(0, "window_id", df["window_id"].to_numpy())
     return out
+
+
+def pack_onehot(onehot: pd.DataFrame):
+    """
+    Pack the 0/1 level columns into a per-row byte bitmap.
+
+    Returns (packed, columns): packed has shape (N, ceil(C/8)) uint8 from
+    np.packbits, columns records the bit order for unpack_onehot. 18 level
+    columns fit in 3 bytes per row instead of 18.
+    """
+    cols = [c for c in onehot.columns if c != "window_id"]
+    bits = onehot[cols].to_numpy(dtype=np.uint8)
+    return np.packbits(bits, axis=1), cols
+
+
+def unpack_onehot(packed: np.ndarray, columns: Iterable[str]) -> pd.DataFrame:
+    """Inverse of pack_onehot: bitmap back to uint8 0/1 columns."""
+    columns = list(columns)
+    bits = np.unpackbits(packed, axis=1, count=len(columns))
+    return pd.DataFrame(bits, columns=columns)
@@ -11,16 +11,21 @@ import pandas as pd
 import numpy as np
 
 
-def _new_mmsi_rate(df: pd.DataFrame, lookback_k: int) -> pd.Series:
-    """Compute rate of MMSI not seen in previous K windows."""
+def _new_mmsi_rate(uniques: pd.Series, lookback_k: int) -> pd.Series:
+    """Compute rate of MMSI not seen in previous K windows.
+
+    Takes the per-window unique-mmsi arrays (shared with the F1 count) and
+    loops over windows (not rows) with NumPy set algebra on small arrays.
+    """
     rates = {}
     recent = deque(maxlen=lookback_k)
-    
-    for win_id, grp in df.groupby("window_id", sort=True):
-        cur = set(grp["mmsi"].unique())
-        prev = set().union(*recent) if recent else set()
-        new_cnt = len(cur - prev)
-        denom = max(len(cur), 1)
+    for win_id, cur in uniques.items():
+        cur = np.asarray(cur)
+        if recent:
+            new_cnt = np.setdiff1d(cur, np.concatenate(recent)).size
+        else:
+            new_cnt = cur.size
+        denom = max(cur.size, 1)
         rates[win_id] = new_cnt / denom
         recent.append(cur)
     return pd.Series(rates)
@@ -31,83 +36,91 @@ def _message_burstiness(counts: pd.Series, baseline_windows: int, eps: float) ->
     return counts / (rolling + eps)
 
 
-def _position_jump_rate(df: pd.DataFrame, vmax_knots: float) -> pd.Series:
-    from utils.geo import haversine_km  # local import to avoid hard dependency at module import time
+def _kinematic_flags(
+    df: pd.DataFrame,
+    vmax_knots: float,
+    sog_high: float,
+    cog_jump_deg: float,
+    sog_jump_per_min: float,
+):
+    """
+    Position-jump (F4) and speed/heading-inconsistency (F5) window means
+    from a single (mmsi, ts) sorted pass.
+
+    Both features need per-MMSI adjacent-row deltas, so they share one sort
+    and one set of raw arrays; rows where the MMSI changes get NaN deltas,
+    matching per-group diff semantics, and one grouped mean emits both.
+    """
+    from utils.geo import haversine_km_vec  # local import to avoid hard dependency at module import time
 
     if not {"mmsi", "ts", "lat", "lon", "window_id"}.issubset(df.columns):
         raise KeyError("df must contain columns: mmsi, ts, lat, lon, window_id")
 
-    d = df.sort_values(["mmsi", "ts"]).copy()
-
-    # Previous point per MMSI
-    d["lat_prev"] = d.groupby("mmsi")["lat"].shift(1)
-    d["lon_prev"] = d.groupby("mmsi")["lon"].shift(1)
-    d["ts_prev"] = d.groupby("mmsi")["ts"].shift(1)
-
-    # Time delta (hours)
-    dt_h = (d["ts"] - d["ts_prev"]).dt.total_seconds() / 3600.0
-    d["dt_h"] = dt_h
-
-    # Distance (km) for valid pairs only
-    valid = d["lat_prev"].notna() & d["lon_prev"].notna() & d["dt_h"].notna() & (d["dt_h"] > 0)
-
-    # Initialize implied speed as NaN (float-friendly)
-    d["v_knots"] = np.nan
-
-    # Compute implied speed for valid rows (row-wise apply only on valid subset)
-    # (최적화는 나중에 가능: numpy 벡터화/numba 등)
-    def _dist_km(row) -> float:
-        return haversine_km(row["lat_prev"], row["lon_prev"], row["lat"], row["lon"])
-
-    dist_km = d.loc[valid].apply(_dist_km, axis=1)
-    v_kmh = dist_km / d.loc[valid, "dt_h"]
-    v_knots = v_kmh / 1.852  # 1 knot = 1.852 km/h
-    d.loc[valid, "v_knots"] = v_knots
-
-    # Jump flag
-    flag = (d["v_knots"] > float(vmax_knots))
-
-    # Aggregate per window (assign to the later point's window_id = current row's window_id)
-    out = flag.groupby(d["window_id"]).mean()
-
-    # Windows with no valid pairs won't appear; caller fillna(0) later is fine
-    return out
-
-
-
-def _speed_heading_inconsistency(
-    df: pd.DataFrame, sog_high: float, cog_jump_deg: float, sog_jump_per_min: float
-) -> pd.Series:
-    """
-    Flag rows where high speed pairs with heading jump or sudden speed jump.
-    Uses per-MMSI temporal diffs.
-    """
-    df = df.sort_values(["mmsi", "ts"]).copy()
-    df["ts_delta_min"] = df.groupby("mmsi")["ts"].diff().dt.total_seconds() / 60.0
-    df["cog_delta"] = df.groupby("mmsi")["cog"].diff().abs()
-    df["cog_delta"] = df["cog_delta"].clip(upper=360.0)
-    df["cog_delta"] = df["cog_delta"].apply(lambda x: 360 - x if x > 180 else x)
-
-    df["sog_delta_per_min"] = (
-        df.groupby("mmsi")["sog"].diff().abs() / df["ts_delta_min"].replace(0, pd.NA)
+    d = df.sort_values(["mmsi", "ts"])  # the only full sort for F4+F5
+
+    mmsi = d["mmsi"].to_numpy()
+    ts = d["ts"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    lat = d["lat"].to_numpy(dtype=np.float64)
+    lon = d["lon"].to_numpy(dtype=np.float64)
+    sog = d["sog"].to_numpy(dtype=np.float64)
+    cog = d["cog"].to_numpy(dtype=np.float64)
+
+    n = len(d)
+    dt_min = np.full(n, np.nan)
+    dist_km = np.full(n, np.nan)
+    cog_delta = np.full(n, np.nan)
+    sog_delta = np.full(n, np.nan)
+    if n > 1:
+        same_mmsi = mmsi[1:] == mmsi[:-1]
+        dt_min[1:] = np.where(same_mmsi, (ts[1:] - ts[:-1]) / 60e9, np.nan)
+        dist_km[1:] = np.where(
+            same_mmsi, haversine_km_vec(lat[:-1], lon[:-1], lat[1:], lon[1:]), np.nan
+        )
+        cog_delta[1:] = np.where(same_mmsi, np.abs(cog[1:] - cog[:-1]), np.nan)
+        sog_delta[1:] = np.where(same_mmsi, np.abs(sog[1:] - sog[:-1]), np.nan)
+
+    # F4: implied speed over the previous fix (valid when dt > 0)
+    dt_h = dt_min / 60.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v_knots = np.where(dt_h > 0, dist_km / dt_h / 1.852, np.nan)  # 1 knot = 1.852 km/h
+    jump = v_knots > float(vmax_knots)
+
+    # F5: high speed paired with heading jump, or sudden speed change
+    cog_delta = np.minimum(cog_delta, 360.0)
+    cog_delta = np.where(cog_delta > 180.0, 360.0 - cog_delta, cog_delta)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sog_delta_per_min = np.where(dt_min == 0.0, np.nan, sog_delta / dt_min)
+    incons = ((sog > sog_high) & (cog_delta > cog_jump_deg)) | (sog_delta_per_min > sog_jump_per_min)
+
+    means = (
+        pd.DataFrame({"jump": jump, "incons": incons}, index=d.index)
+        .groupby(d["window_id"])
+        .mean()
     )
-
-    flag = (
-        ((df["sog"] > sog_high) & (df["cog_delta"] > cog_jump_deg))
-        | (df["sog_delta_per_min"] > sog_jump_per_min)
-    )
-    return flag.groupby(df["window_id"]).mean()
+    return means["jump"], means["incons"]
 
 
 def _spatial_density_entropy(df: pd.DataFrame, eps: float) -> pd.Series:
     """Shannon entropy of spatial density per window using gx, gy buckets."""
-    ent = {}
-    for win_id, grp in df.groupby("window_id"):
-        counts = grp.groupby(["gx", "gy"]).size()
-        probs = counts / counts.sum()
-        h = -(probs * np.log(probs + eps)).sum()
-        ent[win_id] = h
-    return pd.Series(ent)
+    if df.empty:
+        return pd.Series(dtype=np.float64)
+
+    win_ids, win_codes = np.unique(df["window_id"].to_numpy(), return_inverse=True)
+    gx = df["gx"].to_numpy(dtype=np.int64)
+    gy = df["gy"].to_numpy(dtype=np.int64)
+
+    # Flatten (window, gx, gy) into one integer key so a single np.unique
+    # yields the per-window cell occupancy counts without any Python loop.
+    cell = gx * (gy.max() + 1) + gy
+    key = win_codes.astype(np.int64) * (cell.max() + 1) + cell
+    uniq_key, counts = np.unique(key, return_counts=True)
+    key_win = uniq_key // (cell.max() + 1)
+
+    totals = np.bincount(win_codes)
+    probs = counts / totals[key_win]
+    terms = -probs * np.log(probs + eps)
+    ent = np.bincount(key_win, weights=terms, minlength=len(win_ids))
+    return pd.Series(ent, index=win_ids)
 
 
 def compute_features(df: pd.DataFrame, cfg: Dict) -> pd.DataFrame:
@@ -128,38 +141,37 @@ def compute_features(df: pd.DataFrame, cfg: Dict) -> pd.DataFrame:
     sog_high = cfg["features"].get("sog_high_knots", 10.0)
     sog_jump_rate = cfg["features"].get("sog_jump_knots_per_min", 20.0)
 
-    # F1: unique MMSI count
-    f1 = df.groupby("window_id")["mmsi"].nunique()
-
-    # F2: new MMSI rate
-    f2 = _new_mmsi_rate(df, lookback_k)
+    # F1 + F2 share one grouped pass over mmsi: the per-window unique arrays
+    # give both the count and the new-identity rate.
+    g = df.groupby("window_id", sort=True)
+    uniques = g["mmsi"].unique()
+    f1 = uniques.map(len)
+    f2 = _new_mmsi_rate(uniques, lookback_k)
 
     # F3: message burstiness
-    counts = df.groupby("window_id").size()
+    counts = g.size()
     f3 = _message_burstiness(counts, burst_w, eps)
 
-    # F4: position jump rate (proxy via speed threshold)
-    f4 = _position_jump_rate(df, vmax)
-
-    # F5: speed/heading inconsistency
-    f5 = _speed_heading_inconsistency(df, sog_high, cog_jump, sog_jump_rate)
+    # F4 + F5 share one (mmsi, ts) sorted pass and one grouped mean
+    f4, f5 = _kinematic_flags(df, vmax, sog_high, cog_jump, sog_jump_rate)
 
     # F6: spatial density entropy
     f6 = _spatial_density_entropy(df, eps)
 
-    feats = pd.concat(
-        [
-            f1.rename("F1_unique_mmsi_count"),
-            f2.rename("F2_new_mmsi_rate"),
-            f3.rename("F3_message_burstiness"),
-            f4.rename("F4_position_jump_rate"),
-            f5.rename("F5_speed_heading_inconsistency"),
-            f6.rename("F6_spatial_density_entropy"),
-        ],
-        axis=1,
+    # All six series come from sorted groupings over the same window ids,
+    # so assemble from raw arrays on the shared index instead of letting
+    # pd.concat re-align six indexes.
+    feats = pd.DataFrame(
+        {
+            "window_id": f1.index.to_numpy(),
+            "F1_unique_mmsi_count": f1.to_numpy(),
+            "F2_new_mmsi_rate": f2.to_numpy(),
+            "F3_message_burstiness": f3.to_numpy(),
+            "F4_position_jump_rate": f4.to_numpy(),
+            "F5_speed_heading_inconsistency": f5.to_numpy(),
+            "F6_spatial_density_entropy": f6.to_numpy(),
+        }
     )
-    feats.index.name = "window_id"
-    feats = feats.reset_index()
 
     for col in ["F2_new_mmsi_rate", "F4_position_jump_rate", "F5_speed_heading_inconsistency"]:
         feats[col] = feats[col].clip(lower=0.0)
@@ -3,34 +3,36 @@ Filter AIS dataframe to a given port using bbox or polygon from ports/ports.yaml
 """
 from __future__ import annotations
 
-import yaml
+import numpy as np
 import pandas as pd
 from typing import Dict, Iterable, Tuple
 
 from utils.geo import BBox
+from utils.io import load_yaml
 
 
 def _load_ports(path: str) -> Dict:
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    return load_yaml(path)
 
 
-def _point_in_poly(lon: float, lat: float, poly: Iterable[Tuple[float, float]]) -> bool:
-    # Ray casting algorithm for lon/lat polygon
-    inside = False
-    pts = list(poly)
-    n = len(pts)
-    if n < 3:
-        return False
-    for i in range(n):
-        x1, y1 = pts[i]
-        x2, y2 = pts[(i + 1) % n]
-        intersects = ((y1 > lat) != (y2 > lat)) and (
-            lon < (x2 - x1) * (lat - y1) / (y2 - y1 + 1e-15) + x1
-        )
-        if intersects:
-            inside = not inside
-    return inside
+def _points_in_poly(lon: np.ndarray, lat: np.ndarray, poly: Iterable[Tuple[float, float]]) -> np.ndarray:
+    # Ray casting for all points at once: broadcast rows against polygon edges
+    pts = np.asarray(list(poly), dtype=np.float64)
+    if pts.shape[0] < 3:
+        return np.zeros(len(lon), dtype=bool)
+
+    x1 = pts[:, 0]
+    y1 = pts[:, 1]
+    x2 = np.roll(x1, -1)
+    y2 = np.roll(y1, -1)
+
+    lon = np.asarray(lon, dtype=np.float64)[:, None]
+    lat = np.asarray(lat, dtype=np.float64)[:, None]
+
+    crosses = ((y1 > lat) != (y2 > lat)) & (
+        lon < (x2 - x1) * (lat - y1) / (y2 - y1 + 1e-15) + x1
+    )
+    return np.bitwise_xor.reduce(crosses, axis=1)
 
 
 def filter_by_port(
@@ -57,10 +59,10 @@ def filter_by_port(
     bbox = BBox(*bbox_vals)
 
     if use_polygon and entry.get("polygon"):
-        poly = [(float(p[0]), float(p[1])) for p in entry["polygon"]]
-        mask = df.apply(lambda r: _point_in_poly(r["lon"], r["lat"], poly), axis=1)
         if not {"lat", "lon"}.issubset(df.columns):
             raise KeyError("df must have 'lat' and 'lon'")
+        poly = [(float(p[0]), float(p[1])) for p in entry["polygon"]]
+        mask = _points_in_poly(df["lon"].to_numpy(), df["lat"].to_numpy(), poly)
 
     else:
         mask = (
@@ -3,8 +3,9 @@ Map lat/lon to uniform grid indices gx, gy within a port bbox.
 """
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
-from utils.geo import BBox, grid_index
+from utils.geo import BBox
 
 
 def add_grid_indices(df: pd.DataFrame, bbox_vals, nx: int, ny: int, clamp: bool = True) -> pd.DataFrame:
@@ -12,16 +13,24 @@ def add_grid_indices(df: pd.DataFrame, bbox_vals, nx: int, ny: int, clamp: bool
         raise KeyError("df must have 'lat' and 'lon'")
     if len(bbox_vals) != 4:
         raise ValueError("bbox must be [min_lon, min_lat, max_lon, max_lat]")
+    if nx <= 0 or ny <= 0:
+        raise ValueError("nx and ny must be positive.")
     bbox = BBox(*bbox_vals)
 
-    def _map(row):
-        gx, gy = grid_index(row["lat"], row["lon"], bbox, nx, ny, clamp=clamp)
-        return pd.Series({"gx": gx, "gy": gy})
+    lon = df["lon"].to_numpy(dtype=np.float64)
+    lat = df["lat"].to_numpy(dtype=np.float64)
 
-    df = df.copy()
-    grid_df = df.apply(_map, axis=1)
-    
-    df[["gx", "gy"]] = grid_df
-    df = df.dropna(subset=["gx", "gy"])
-    df[["gx", "gy"]] = df[["gx", "gy"]].astype(int)
+    fx = np.floor((lon - bbox.min_lon) / (bbox.width() + 1e-15) * nx)
+    fy = np.floor((lat - bbox.min_lat) / (bbox.height() + 1e-15) * ny)
+
+    valid = ~(np.isnan(fx) | np.isnan(fy))
+    if clamp:
+        fx = np.clip(fx, 0, nx - 1)
+        fy = np.clip(fy, 0, ny - 1)
+    else:
+        valid &= (fx >= 0) & (fx < nx) & (fy >= 0) & (fy < ny)
+
+    df = df.loc[valid]  # boolean take already allocates a fresh frame
+    df["gx"] = fx[valid].astype(int)
+    df["gy"] = fy[valid].astype(int)
     return df
@@ -6,6 +6,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Dict, Optional
 
+import numpy as np
 import pandas as pd
 
 REQUIRED_STD_COLS = ["ts", "mmsi", "lat", "lon", "sog", "cog"]
@@ -26,8 +27,18 @@ class SchemaMapping:
 
 
 def load_raw_csv(path: str) -> pd.DataFrame:
-    """Load raw AIS CSV with flexible dtype inference."""
-    df = pd.read_csv(path)
+    """Load raw AIS CSV with flexible dtype inference.
+
+    Uses the multi-threaded pyarrow CSV parser when available; raw column
+    names vary per source, so dtypes are applied later in sanitize rather
+    than at parse time.
+    """
+    try:
+        import pyarrow.csv as pacsv
+    except ImportError:
+        df = pd.read_csv(path)
+    else:
+        df = pacsv.read_csv(path).to_pandas(self_destruct=True)
     if df.empty:
         raise ValueError(f"Loaded CSV is empty: {path}")
     return df
@@ -57,24 +68,28 @@ def map_schema(df: pd.DataFrame, mapping: SchemaMapping) -> pd.DataFrame:
     return out
 
 
-def sanitize(df: pd.DataFrame, tz_hint: str = "UTC") -> pd.DataFrame:
+def sanitize(df: pd.DataFrame, tz_hint: str = "UTC", ts_format: Optional[str] = None) -> pd.DataFrame:
     """
     Enforce types and drop obviously invalid rows.
     - ts: timezone-aware UTC datetime
-    - mmsi: string
-    - lat/lon: float within bounds
-    - sog: 0..102.3 (AIS spec special value 102.2)
-    - cog: 0..360
+    - mmsi: categorical of stripped strings (low cardinality vs rows)
+    - lat/lon: float32 within bounds
+    - sog: float32, 0..102.3 (AIS spec special value 102.2)
+    - cog: float32, 0..360
+    float32 keeps ~7 significant digits, plenty for AIS coordinates and
+    kinematics, and halves memory for every downstream pass.
     """
     from utils.time import to_datetime_utc  # local import to avoid cycles
 
-    df = df.copy()
+    # Shallow copy: every write below replaces whole columns or filters rows,
+    # both of which allocate, so the caller's frame is never mutated.
+    df = df.copy(deep=False)
 
-    df["ts"] = to_datetime_utc(df["ts"], tz_hint=tz_hint)
+    df["ts"] = to_datetime_utc(df["ts"], tz_hint=tz_hint, ts_format=ts_format)
     df["mmsi"] = df["mmsi"].astype(str).str.strip()
 
     for col in ["lat", "lon", "sog", "cog"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float32)
 
     df = df.dropna(subset=["ts", "mmsi", "lat", "lon", "sog", "cog"])
 
@@ -88,19 +103,23 @@ def sanitize(df: pd.DataFrame, tz_hint: str = "UTC") -> pd.DataFrame:
     if "nav_status" in df.columns:
         df["nav_status"] = df["nav_status"].astype(str).str.strip()
 
+    df["mmsi"] = df["mmsi"].astype("category")
+
     df = df.sort_values(["mmsi", "ts"]).reset_index(drop=True)
     return df
 
 
-def load_and_prepare(csv_path: str, mapping_dict: Dict[str, Any], tz_hint: str = "UTC") -> pd.DataFrame:
+def load_and_prepare(
+    csv_path: str, mapping_dict: Dict[str, Any], tz_hint: str = "UTC", ts_format: Optional[str] = None
+) -> pd.DataFrame:
     """Helper: raw csv -> schema map -> sanitize."""
     mapping = SchemaMapping(**mapping_dict)
     df_raw = load_raw_csv(csv_path)
     df_std = map_schema(df_raw, mapping)
-    df_clean = sanitize(df_std, tz_hint=tz_hint)
+    df_clean = sanitize(df_std, tz_hint=tz_hint, ts_format=ts_format)
 
     for col in REQUIRED_STD_COLS:
         if col not in df_clean.columns:
             raise RuntimeError(f"Standard column missing after sanitize: {col}")
 
-    return df_clean
+    return df_clean
@@ -29,7 +29,7 @@ def add_windows(df: pd.DataFrame, dt_minutes: int, t0: Optional[str] = None) ->
         else:
             t0_val = t0_val.tz_convert("UTC")
 
-    df = df.copy()
+    df = df.copy(deep=False)  # only appending window_id, no need to duplicate data
     df["window_id"] = assign_window_id(ts_utc, dt_minutes, t0_val)
     n_before = len(df)
     df = df.dropna(subset=["window_id"])
@@ -5,10 +5,26 @@ from dataclasses import dataclass
 from typing import Tuple, Optional
 import math
 
+import numpy as np
+
 
 EARTH_RADIUS_KM = 6371.0088
 
 
+def haversine_km_vec(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Vectorized great-circle distance over arrays of points (degrees) in kilometers.
+    """
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dphi = np.radians(lat2 - lat1)
+    dlmb = np.radians(lon2 - lon1)
+
+    a = np.sin(dphi / 2.0) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2.0) ** 2
+    c = 2.0 * np.arctan2(np.sqrt(a), np.sqrt(1.0 - a))
+    return EARTH_RADIUS_KM * c
+
+
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Great-circle distance between two points (degrees) in kilometers.
@@ -0,0 +1,30 @@
+# utils/io.py
+"""
+Shared I/O helpers: cached YAML config loading.
+"""
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+
+import yaml
+
+# libyaml-backed loader when available (5-10x faster parse)
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@lru_cache(maxsize=8)
+def _load_yaml_cached(path: str, mtime: float) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=_YamlLoader) or {}
+
+
+def load_yaml(path: str) -> dict:
+    """
+    Parse a YAML file, caching on (abspath, mtime) so sweeps that reload the
+    same configs many times only pay the parse cost once.
+
+    The returned dict is shared across callers — deepcopy before mutating.
+    """
+    path = os.path.abspath(path)
+    return _load_yaml_cached(path, os.path.getmtime(path))
@@ -3,6 +3,8 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from typing import Optional, Tuple
+
+import numpy as np
 import pandas as pd
 
 
@@ -12,13 +14,19 @@ class WindowSpec:
     tz: str = "UTC"
 
 
-def to_datetime_utc(series: pd.Series, tz_hint: str = "UTC") -> pd.Series:
+def to_datetime_utc(series: pd.Series, tz_hint: str = "UTC", ts_format: Optional[str] = None) -> pd.Series:
     """
     Convert a timestamp column to timezone-aware UTC pandas datetime.
     - If input is naive, localize using tz_hint then convert to UTC.
     - If input has timezone, convert to UTC.
+    - ts_format: explicit strftime format (or "ISO8601") forwarded to the
+      parser; avoids the slow per-element inference fallback on mixed input.
     """
-    ts = pd.to_datetime(series, errors="coerce", utc=False)
+    if tz_hint == "UTC":
+        # Fused parse+localize in one vectorized call
+        return pd.to_datetime(series, errors="coerce", utc=True, format=ts_format)
+
+    ts = pd.to_datetime(series, errors="coerce", utc=False, format=ts_format)
 
     # If ts is timezone-aware already, tz will be set.
     # Pandas uses dtype datetime64[ns, tz] for tz-aware.
@@ -51,10 +59,15 @@ def assign_window_id(ts_utc: pd.Series, dt_minutes: int, t0: pd.Timestamp) -> pd
     if t0.tz is None:
         raise ValueError("t0 must be timezone-aware (UTC).")
 
-    dt = pd.Timedelta(minutes=dt_minutes)
-    delta = (ts_utc - t0)
-    window_id = (delta / dt).apply(lambda x: int(x) if pd.notna(x) else pd.NA)
-    return window_id.astype("Int64")
+    # Pure int64 nanosecond arithmetic; NaT is int64 min in the raw array
+    # and is masked back to NA at the end.
+    ts_ns = ts_utc.to_numpy(dtype="datetime64[ns]").view("int64")
+    t0_ns = int(pd.Timestamp(t0).value)
+    dt_ns = int(dt_minutes) * 60 * 1_000_000_000
+
+    nat = ts_ns == np.iinfo(np.int64).min
+    codes = (ts_ns - t0_ns) // dt_ns
+    return pd.Series(pd.arrays.IntegerArray(codes, mask=nat), index=ts_utc.index)
 
 
 def window_bounds(window_id: int, dt_minutes: int, t0: pd.Timestamp) -> Tuple[pd.Timestamp, pd.Timestamp]: